@@ -39,6 +39,9 @@ class Adapter:
         self.wandb = wandb
         self.config_json = config_json
         self.action_data_format = None
+        self.policy_template = None
+        self.decoded_df = None
+        self.decoded_values = None
 
         rl_alg = config_json['rl_config']['agent'] 
 
@@ -109,6 +112,42 @@ class Adapter:
         #print(data)
         return data
 
+    def find_row(self, df, source, name):
+        """Find the position of the measurement with the given source and name.
+
+        Args:
+            df (pandas.dataframe): network stats measurement
+            source (string): the source of the measurement
+            name (string): the name of the measurement
+
+        Returns:
+            int : position of the last matching row, -1 if no row matches
+        """
+        mask = (df['source'].to_numpy() == source) & (df['name'].to_numpy() == name)
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return -1
+        return int(idx[-1])
+
+    def decode_measurement(self, df, decode):
+        """Decode the network stats, reusing the result for the last decoded measurement.
+
+        :meth:`get_observation` and :meth:`get_reward` receive the same measurement every step,
+        so it only needs to be decoded once.
+
+        Args:
+            df (pandas.dataframe): network stats measurement
+            decode (function): decodes df into the values used by the adapter
+
+        Returns:
+            the result of decode(df)
+        """
+        if df is not self.decoded_df:
+            self.decoded_values = decode(df)
+            # keep a reference to df so the identity check above cannot match a recycled object
+            self.decoded_df = df
+        return self.decoded_values
+
     def fill_empty_feature(self, feature, value):
         """Fill the  missing measurements with a input value
 
@@ -11,6 +11,7 @@ import math
 import time
 import pandas as pd
 import json
+import logging
 from pathlib import Path
 import plotext as plt
 from rich.panel import Panel
@@ -18,6 +19,8 @@ from rich.layout import Layout
 from rich.table import Table
 from rich.columns import Columns
 
+logger = logging.getLogger(__name__)
+
 class Adapter(network_gym_client.adapter.Adapter):
     """nqos_split env adapter.
 
@@ -38,13 +41,16 @@ class Adapter(network_gym_client.adapter.Adapter):
         if config_json['env_config']['env'] != self.env:
             sys.exit("[ERROR] wrong environment Adapter. Configured environment: " + str(config_json['env_config']['env']) + " != Launched environment: " + str(self.env))
 
+        self.action_space = spaces.MultiDiscrete(np.array([19]), start=np.array([2]), seed=42)
+        self.observation_space = spaces.MultiDiscrete(np.array([[10], [10]]), start=np.array([[1], [1]]), seed=42)
+
     def get_action_space(self):
         """Get action space for the nqos_split env.
 
         Returns:
             spaces: action spaces
         """
-        return spaces.MultiDiscrete(np.array([19]), start=np.array([2]), seed=42)
+        return self.action_space
 
     #consistent with the get_observation function.
     def get_observation_space(self):
@@ -53,9 +59,32 @@ class Adapter(network_gym_client.adapter.Adapter):
         Returns:
             spaces: observation spaces
         """
+        return self.observation_space
+
+    def get_addends(self, df):
+        """Get the two addends from the network stats.
+
+        Args:
+            df (pd.DataFrame): network stats measurement
+
+        Returns:
+            tuple: (a_value, b_value), -1 for a missing measurement
+        """
+        a_value = -1
+        b_value = -1
+
+        values = df['value'].to_numpy()
+        a_idx = self.find_row(df, 'calculator', 'addend::a')
+        if a_idx >= 0:
+            a_value = values[a_idx][0]
+            self.action_data_format = df.iloc[a_idx]
+            self.policy_template = self.action_data_format.to_dict()
+        b_idx = self.find_row(df, 'calculator', 'addend::b')
+        if b_idx >= 0:
+            b_value = values[b_idx][0]
+
+        return (a_value, b_value)
 
-        return spaces.MultiDiscrete(np.array([[10], [10]]), start=np.array([[1], [1]]), seed=42)
-    
     def get_observation(self, df):
         """Prepare observation for nqos_split env.
 
@@ -68,22 +97,14 @@ class Adapter(network_gym_client.adapter.Adapter):
             spaces: observation spaces
         """
 
-        a_value = -1
-        b_value = -1
+        a_value, b_value = self.decode_measurement(df, self.get_addends)
 
-        for _, row in df.iterrows():
-            if row['source'] == 'calculator' and row['name'] == 'addend::a':
-                a_value = row['value'][0]
-                self.action_data_format = row
-            if row['source'] == 'calculator' and row['name'] == 'addend::b':
-                b_value = row['value'][0]
-
-        print("a_value is", a_value)
-        print("b_value is", b_value)
+        logger.debug('a_value is %s', a_value)
+        logger.debug('b_value is %s', b_value)
 
         observation = np.vstack([a_value, b_value])
-        print("obs shape is", observation.shape)
-        print('Observation --> ' + str(observation))
+        logger.debug('obs shape is %s', observation.shape)
+        logger.debug('Observation --> %s', observation)
         return observation
 
     def get_policy(self, action):
@@ -96,11 +117,11 @@ class Adapter(network_gym_client.adapter.Adapter):
             json: network policy
         """
 
-        policy = json.loads(self.action_data_format.to_json())
+        policy = dict(self.policy_template)
         policy["name"] = "sum"
         policy["value"] = action.tolist()
 
-        print('Action --> ' + str(policy))
+        logger.debug('Action --> %s', policy)
         return policy
 
     def get_reward(self, df):
@@ -113,14 +134,7 @@ class Adapter(network_gym_client.adapter.Adapter):
             spaces: reward spaces
         """
 
-        a_value = -1
-        b_value = -1
-
-        for _, row in df.iterrows():
-            if row['source'] == 'calculator' and row['name'] == 'addend::a':
-                a_value = row['value'][0]
-            if row['source'] == 'calculator' and row['name'] == 'addend::b':
-                b_value = row['value'][0]
+        a_value, b_value = self.decode_measurement(df, self.get_addends)
 
         # difference of the two addends (actually this value is not used by the algorithm)
         self.reward = a_value - b_value
@@ -11,6 +11,7 @@ import math
 import time
 import pandas as pd
 import json
+import logging
 from pathlib import Path
 import plotext
 from rich.panel import Panel
@@ -30,6 +31,8 @@ REWARD_ETA = 1
 VR_DELAY_CONSTRAINT_MS = 5
 VR_THPT_CONSTRAINT_MBPS = 14.7
 
+logger = logging.getLogger(__name__)
+
 class Adapter(network_gym_client.adapter.Adapter):
     """nqos_split env adapter.
 
@@ -130,7 +133,7 @@ class Adapter(network_gym_client.adapter.Adapter):
 
         self.observation = (rxPowerDbm, mcsIndex, ulThpt, vrDelay, nodeLoc)
         # print("obs shape is", self.observation.shape)
-        print('Observation --> ' + str(self.observation))
+        logger.debug('Observation --> %s', self.observation)
 
         return self.observation
 
@@ -149,7 +152,7 @@ class Adapter(network_gym_client.adapter.Adapter):
         policy["name"] = "Py2Cpp::CcaNew"
         policy["value"] = action.tolist()
 
-        print('Action --> ' + str(policy))
+        logger.debug('Action --> %s', policy)
         self.action_history.append(policy["value"][0])
         return policy
 
@@ -173,9 +176,9 @@ class Adapter(network_gym_client.adapter.Adapter):
         self.total_thpt_history.append(ulThptTotal)
         self.vr_thpt_history.append(vrThpt)
 
-        print("ulThpt =", ulThpt)
-        print("ulThptTotal =", ulThptTotal)
-        print("vrThpt =", vrThpt)
+        logger.debug('ulThpt = %s', ulThpt)
+        logger.debug('ulThptTotal = %s', ulThptTotal)
+        logger.debug('vrThpt = %s', vrThpt)
 
         self.vr_delay_history.append(vrDelay)
         self.reward_history.append(self.reward)
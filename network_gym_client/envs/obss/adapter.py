@@ -11,25 +11,73 @@ import math
 import time
 import pandas as pd
 import json
+import logging
 from pathlib import Path
 import plotext
 from rich.panel import Panel
 from rich.layout import Layout
 from rich.table import Table
 from rich.columns import Columns
-from collections import deque
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, fall back to the NumPy scatter below
+    njit = None
 
 # We need to put the RX power matrix into a 1-D observation
 MAX_NUM_NODES_BSS0 = 2 ** 3
 MAX_NUM_NODES = 2 ** 5
 MAX_NUM_OBSERVATION_IDS = MAX_NUM_NODES * MAX_NUM_NODES_BSS0
 
+# The RX power observation is quantized to int8: q = round(rxPowerDbm * RX_POWER_SCALE), rxPowerDbm = q / RX_POWER_SCALE
+RX_POWER_SCALE = 127 / 100
+
 REWARD_ALPHA = 1
 REWARD_BETA = 5
 REWARD_ETA = 1
 VR_DELAY_CONSTRAINT_MS = 5
 VR_THPT_CONSTRAINT_MBPS = 14.7
 
+# Step history kept for the terminal table, one ring buffer row per field
+HISTORY_LEN = 100
+HISTORY_FIELDS = ('action1', 'action2', 'total_thpt', 'vr_thpt', 'vr_delay', 'reward', 'step_num')
+
+# Node indices in the network plot, 4 BSSs with 1 AP and 4 STAs each (TODO: get config from simulation)
+PLOT_AP_IDS = np.arange(0, 4)
+PLOT_VR_STA_IDS = np.arange(4, 5)
+PLOT_STA_IDS = np.arange(5, 4 * (4 + 1))
+
+logger = logging.getLogger(__name__)
+
+def scatter_rx_power(ids, values, rxPowerDbm):
+    """Write RX power values into the (receiver, transmitter) matrix.
+
+    Each id packs the receiver index (bits 5-7) and the transmitter index (bits 0-4).
+
+    Args:
+        ids (np.ndarray): int32 packed ids
+        values (np.ndarray): float32 RX power in dBm
+        rxPowerDbm (np.ndarray): output matrix
+    """
+    rxPowerDbm[ids >> 5, ids & 0x1f] = values
+
+def scatter_rx_power_loop(ids, values, rxPowerDbm):
+    """Loop form of :func:`scatter_rx_power`, compiled with numba when it is installed.
+
+    The compiled kernel does not check bounds, ids must be validated by the caller.
+
+    Args:
+        ids (np.ndarray): int32 packed ids within [0, MAX_NUM_OBSERVATION_IDS)
+        values (np.ndarray): float32 RX power in dBm, same length as ids
+        rxPowerDbm (np.ndarray): output matrix
+    """
+    for k in range(ids.shape[0]):
+        rxPowerDbm[ids[k] >> 5, ids[k] & 0x1f] = values[k]
+
+if njit is not None:
+    scatter_rx_power = njit(cache=True)(scatter_rx_power_loop)
+
 class Adapter(network_gym_client.adapter.Adapter):
     """nqos_split env adapter.
 
@@ -50,14 +98,48 @@ class Adapter(network_gym_client.adapter.Adapter):
         if config_json['env_config']['env'] != self.env:
             sys.exit("[ERROR] wrong environment Adapter. Configured environment: " + str(config_json['env_config']['env']) + " != Launched environment: " + str(self.env))
 
+        # OBSS_PD: min: -82 dBm, max: -62 dBm --> 21 integers
+        # TX power: min: 16 dBm, max: 20 dBm --> 5 integers
+        self.action_space = spaces.MultiDiscrete(np.array([21, 5]), start=np.array([-82, 16]), seed=42, dtype=np.int32)
+        self.observation_space = spaces.Tuple((
+            spaces.Box(low=-127, high=127, shape=(MAX_NUM_NODES_BSS0, MAX_NUM_NODES), dtype=np.int8), # RX power, quantized
+            spaces.Box(low=0, high=11, shape=(MAX_NUM_NODES_BSS0, ), dtype=np.uint32),     # MCS
+            spaces.Box(low=0, high=1000, shape=(MAX_NUM_NODES, ), dtype=np.float32),   # UL throughput
+            spaces.Box(low=0, high=10000, shape=(1, ), dtype=np.float32),   # VR node access delay
+            spaces.Box(low=-100, high=100, shape=(MAX_NUM_NODES, 2), dtype=np.float32)  # Node location
+        ))
+
         self.mcs = None
-        self.action1_history = deque(maxlen=100)
-        self.action2_history = deque(maxlen=100)
-        self.total_thpt_history = deque(maxlen=100)
-        self.vr_thpt_history = deque(maxlen=100)
-        self.vr_delay_history = deque(maxlen=100)
-        self.reward_history = deque(maxlen=100)
-        self.step_num_history = deque(maxlen=100)
+        self.enable_visualization = config_json['enable_terminal_redering']
+        self.plot_node_loc = None
+        self.history = np.zeros((len(HISTORY_FIELDS), HISTORY_LEN), dtype=np.float64)
+        self.history_count = np.zeros((len(HISTORY_FIELDS), ), dtype=np.int64)
+        self.history_row = {field: row for row, field in enumerate(HISTORY_FIELDS)}
+
+        # observation buffers, allocated once and refilled by every get_observation call
+        self.rxPowerDbm = np.zeros((MAX_NUM_NODES_BSS0, MAX_NUM_NODES), dtype=np.float32)
+        self.rxPowerQ = np.zeros((MAX_NUM_NODES_BSS0, MAX_NUM_NODES), dtype=np.int8)
+        self.rxPowerScratch = np.zeros((MAX_NUM_NODES_BSS0, MAX_NUM_NODES), dtype=np.float32)
+        # compile the scatter kernel now rather than on the first step
+        scatter_rx_power(np.zeros((1, ), dtype=np.int32), np.zeros((1, ), dtype=np.float32), self.rxPowerDbm)
+        self.mcsIndex = np.zeros((MAX_NUM_NODES_BSS0, ), dtype=np.uint32)
+        self.ulThpt = np.zeros((MAX_NUM_NODES, ), dtype=np.float32)
+        self.vrDelay = np.zeros((1, ), dtype=np.float32)
+        self.nodeLoc = np.zeros((MAX_NUM_NODES, 2), dtype=np.float32)
+
+        # per-measurement decoders used by get_observation, keyed by measurement name
+        self.observation_handlers = {
+            'Cpp2Py::RxPowerDbmMatrix': self.set_rx_power,
+            'Cpp2Py::NodeX': self.set_node_x,
+            'Cpp2Py::NodeY': self.set_node_y,
+            'Cpp2Py::McsIndex': self.set_mcs_index,
+            'Cpp2Py::UplinkThptMbps': self.set_ul_thpt,
+            'Cpp2Py::AccessDelayMs': self.set_vr_delay,
+        }
+        # measurement names are mapped to integer codes once per step, the codes index the handler list
+        self.observation_names = pd.Index(list(self.observation_handlers.keys()))
+        self.observation_handler_list = list(self.observation_handlers.values())
+        self.rx_power_code = self.observation_names.get_loc('Cpp2Py::RxPowerDbmMatrix')
 
     def get_action_space(self):
         """Get action space for the nqos_split env.
@@ -65,10 +147,7 @@ class Adapter(network_gym_client.adapter.Adapter):
         Returns:
             spaces: action spaces
         """
-
-        # OBSS_PD: min: -82 dBm, max: -62 dBm --> 21 integers
-        # TX power: min: 16 dBm, max: 20 dBm --> 5 integers
-        return spaces.MultiDiscrete(np.array([21, 5]), start=np.array([-82, 16]), seed=42, dtype=np.int32)
+        return self.action_space
 
     #consistent with the get_observation function.
     def get_observation_space(self):
@@ -77,19 +156,14 @@ class Adapter(network_gym_client.adapter.Adapter):
         Returns:
             spaces: observation spaces
         """
+        return self.observation_space
 
-        return spaces.Tuple((
-            spaces.Box(low=-100, high=100, shape=(MAX_NUM_NODES_BSS0, MAX_NUM_NODES), dtype=np.float32), # RX power
-            spaces.Box(low=0, high=11, shape=(MAX_NUM_NODES_BSS0, ), dtype=np.uint32),     # MCS
-            spaces.Box(low=0, high=1000, shape=(MAX_NUM_NODES, ), dtype=np.float32),   # UL throughput
-            spaces.Box(low=0, high=10000, shape=(1, ), dtype=np.float32),   # VR node access delay
-            spaces.Box(low=-100, high=100, shape=(MAX_NUM_NODES, 2), dtype=np.float32)  # Node location
-        ))
-    
     def get_observation(self, df):
         """Prepare observation for nqos_split env.
 
         This function should return the same number of features defined in the :meth:`get_observation_space`.
+        The returned arrays are reused by the next call, copy them if they need to outlive the step.
+        The RX power matrix is returned quantized to int8, divide it by RX_POWER_SCALE to get dBm.
 
         Args:
             df (pd.DataFrame): network stats measurement
@@ -98,44 +172,60 @@ class Adapter(network_gym_client.adapter.Adapter):
             spaces: observation spaces
         """
 
-        rxPowerDbm = np.zeros((MAX_NUM_NODES_BSS0, MAX_NUM_NODES), dtype=np.float32)
-        mcsIndex = np.zeros((MAX_NUM_NODES_BSS0, ), dtype=np.uint32)
-        ulThpt = np.zeros((MAX_NUM_NODES, ), dtype=np.float32)
-        vrDelay = np.zeros((1, ), dtype=np.float32)
-        nodeLoc = np.zeros((MAX_NUM_NODES, 2), dtype=np.float32)
-
-        for _, row in df.iterrows():
-            ids = row['id']
-            values = row['value']
-            if row['source'] == 'Obss' and row['name'] == 'Cpp2Py::RxPowerDbmMatrix':
-                for id, value in zip(ids, values):
-                    # print("id=", id)
-                    rxNum = id >> 5
-                    txId = id & 0x1f
-                    # print("rxId=", rxNum)
-                    # print("txId=", txId)
-                    rxPowerDbm[rxNum][txId] = value
-                self.action_data_format = row
-            elif row['source'] == 'Obss' and row['name'] == 'Cpp2Py::NodeX':
-                nodeLoc[ids, 0] = values
-            elif row['source'] == 'Obss' and row['name'] == 'Cpp2Py::NodeY':
-                nodeLoc[ids, 1] = values
-            elif row['source'] == 'Obss' and row['name'] == 'Cpp2Py::McsIndex':
-                mcsIndex[ids] = values
-            elif row['source'] == 'Obss' and row['name'] == 'Cpp2Py::UplinkThptMbps':
-                ulThpt[ids] = values
-            else:
-                id = ids[0]
-                value = values[0]
-                if row['source'] == 'Obss' and row['name'] == 'Cpp2Py::AccessDelayMs':
-                    vrDelay[0] = value  # id not used
-
-        self.observation = (rxPowerDbm, mcsIndex, ulThpt, vrDelay, nodeLoc)
+        self.rxPowerDbm.fill(0)
+        self.mcsIndex.fill(0)
+        self.ulThpt.fill(0)
+        self.vrDelay.fill(0)
+        self.nodeLoc.fill(0)
+
+        codes = self.observation_names.get_indexer(df['name'])
+        codes[df['source'].to_numpy() != 'Obss'] = -1
+        ids_col = df['id'].to_numpy()
+        values_col = df['value'].to_numpy()
+        for row in np.flatnonzero(codes >= 0):
+            self.observation_handler_list[codes[row]](ids_col[row], values_col[row])
+
+        rx_rows = np.flatnonzero(codes == self.rx_power_code)
+        if rx_rows.size > 0:
+            self.action_data_format = df.iloc[rx_rows[-1]]
+            self.policy_template = self.action_data_format.to_dict()
+
+        # RX power is within [-100, 100] dBm, int8 keeps a 0.79 dB resolution at a quarter of the size
+        np.multiply(self.rxPowerDbm, RX_POWER_SCALE, out=self.rxPowerScratch)
+        np.rint(self.rxPowerScratch, out=self.rxPowerScratch)
+        np.clip(self.rxPowerScratch, -127, 127, out=self.rxPowerScratch)
+        np.copyto(self.rxPowerQ, self.rxPowerScratch, casting='unsafe')
+
+        self.observation = (self.rxPowerQ, self.mcsIndex, self.ulThpt, self.vrDelay, self.nodeLoc)
         # print("obs shape is", self.observation.shape)
-        print('Observation --> ' + str(self.observation))
+        logger.debug('Observation --> %s', self.observation)
 
         return self.observation
 
+    def set_rx_power(self, ids, values):
+        ids = np.ascontiguousarray(ids, dtype=np.int32)
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        if ids.shape != values.shape:
+            raise ValueError("RxPowerDbmMatrix has " + str(ids.size) + " ids but " + str(values.size) + " values")
+        if ids.size > 0 and (ids.min() < 0 or ids.max() >= MAX_NUM_OBSERVATION_IDS):
+            raise IndexError("RxPowerDbmMatrix id out of range [0, " + str(MAX_NUM_OBSERVATION_IDS) + ")")
+        scatter_rx_power(ids, values, self.rxPowerDbm)
+
+    def set_node_x(self, ids, values):
+        self.nodeLoc[ids, 0] = values
+
+    def set_node_y(self, ids, values):
+        self.nodeLoc[ids, 1] = values
+
+    def set_mcs_index(self, ids, values):
+        self.mcsIndex[ids] = values
+
+    def set_ul_thpt(self, ids, values):
+        self.ulThpt[ids] = values
+
+    def set_vr_delay(self, ids, values):
+        self.vrDelay[0] = values[0]  # id not used
+
     def get_policy(self, action):
         """Prepare policy for the nqos_split env.
 
@@ -146,21 +236,21 @@ class Adapter(network_gym_client.adapter.Adapter):
             json: network policy
         """
 
-        policy1 = json.loads(self.action_data_format.to_json())
+        policy1 = dict(self.policy_template)
         policy1['id'] = [0]
         policy1["name"] = "Py2Cpp::ObssPdNew"
-        policy1["value"] = [action[0]]
+        policy1["value"] = [int(action[0])]
 
-        print('Action1 --> ' + str(policy1))
-        self.action1_history.append(policy1["value"][0])
+        logger.debug('Action1 --> %s', policy1)
+        self.history_append('action1', policy1["value"][0])
 
-        policy2 = json.loads(self.action_data_format.to_json())
+        policy2 = dict(self.policy_template)
         policy2['id'] = [0]
         policy2["name"] = "Py2Cpp::TxPowerNew"
-        policy2["value"] = [action[1]]
+        policy2["value"] = [int(action[1])]
 
-        print('Action2 --> ' + str(policy2))
-        self.action2_history.append(policy2["value"][0])
+        logger.debug('Action2 --> %s', policy2)
+        self.history_append('action2', policy2["value"][0])
 
         return [policy1, policy2]
 
@@ -181,26 +271,57 @@ class Adapter(network_gym_client.adapter.Adapter):
 
         self.reward = REWARD_ALPHA * ulThptTotal + REWARD_BETA * (VR_DELAY_CONSTRAINT_MS - vrDelay) + REWARD_ETA * (vrThpt - VR_THPT_CONSTRAINT_MBPS)
 
-        self.total_thpt_history.append(ulThptTotal)
-        self.vr_thpt_history.append(vrThpt)
+        self.history_append('total_thpt', ulThptTotal)
+        self.history_append('vr_thpt', vrThpt)
 
-        print("ulThpt =", ulThpt)
-        print("ulThptTotal =", ulThptTotal)
-        print("vrThpt =", vrThpt)
+        logger.debug('ulThpt = %s', ulThpt)
+        logger.debug('ulThptTotal = %s', ulThptTotal)
+        logger.debug('vrThpt = %s', vrThpt)
 
-        self.vr_delay_history.append(vrDelay)
-        self.reward_history.append(self.reward)
-        self.step_num_history.append(len(self.step_num_history) + 1)
+        self.history_append('vr_delay', vrDelay[0])
+        self.history_append('reward', self.reward[0])
+        self.history_append('step_num', self.history_count[self.history_row['step_num']] + 1)
 
         # visualization here
         self.visualize_network()
 
         return self.reward
 
+    def history_append(self, field, value):
+        """Append a value to the step history, overwriting the oldest one once the buffer is full.
+
+        Args:
+            field (str): one of HISTORY_FIELDS
+            value (float): value to append
+        """
+        row = self.history_row[field]
+        self.history[row, self.history_count[row] % HISTORY_LEN] = value
+        self.history_count[row] += 1
+
+    def history_tail(self, field, n):
+        """Get the n most recent values of the step history, newest first.
+
+        Args:
+            field (str): one of HISTORY_FIELDS
+            n (int): number of values to return
+
+        Returns:
+            np.ndarray: array of length n, padded with NaN when fewer values are stored
+        """
+        row = self.history_row[field]
+        count = self.history_count[row]
+        k = min(n, count, HISTORY_LEN)
+        tail = np.full((n, ), np.nan)
+        tail[:k] = self.history[row, (count - 1 - np.arange(k)) % HISTORY_LEN]
+        return tail
+
     def visualize_network(self):
-        if self.layout is None:
+        if not self.enable_visualization or self.layout is None:
             return
-        
+
+        # the plot is drawn from the rendering thread, keep a copy of the reused observation buffer
+        self.plot_node_loc = self.nodeLoc.copy()
+
         # visualize
         left = self.layout["left"]
         mixin_left = Panel(self.plotextMixin(self.make_plot))
@@ -215,7 +336,7 @@ class Adapter(network_gym_client.adapter.Adapter):
             self.layout["main"].visible = True
 
     def make_plot(self, width, height):
-        nodeLoc = self.observation[4]
+        nodeLoc = self.plot_node_loc
         plotext.clf()
         # TODO: get config from simulation
         x_h = [0, 50]
@@ -224,17 +345,10 @@ class Adapter(network_gym_client.adapter.Adapter):
         y_v = [0, 50]
         plotext.plot(x_h, y_h, color="cyan", marker="_")
         plotext.plot(x_v, y_v, color="cyan", marker="|")
-        for i in range(4 * (4 + 1)):    # total 20 nodes
-            if i < 4:
-                # Plot AP
-                plotext.plot([nodeLoc[i][0]], [nodeLoc[i][1]], marker = "heart", color='red')
-            else:
-                # Plot STA
-                if i == 4:
-                    # VR STA
-                    plotext.plot([nodeLoc[i][0]], [nodeLoc[i][1]], marker = "star", color='green')
-                else:
-                    plotext.plot([nodeLoc[i][0]], [nodeLoc[i][1]], marker = "star", color='white')
+        # Plot APs, VR STA and normal STAs, one call per group
+        plotext.scatter(nodeLoc[PLOT_AP_IDS, 0].tolist(), nodeLoc[PLOT_AP_IDS, 1].tolist(), marker = "heart", color='red')
+        plotext.scatter(nodeLoc[PLOT_VR_STA_IDS, 0].tolist(), nodeLoc[PLOT_VR_STA_IDS, 1].tolist(), marker = "star", color='green')
+        plotext.scatter(nodeLoc[PLOT_STA_IDS, 0].tolist(), nodeLoc[PLOT_STA_IDS, 1].tolist(), marker = "star", color='white')
         plotext.xlim(0, 50)
         plotext.ylim(0, 50)
         plotext.plotsize(width, height)
@@ -245,27 +359,13 @@ class Adapter(network_gym_client.adapter.Adapter):
     def make_table(self, n=20):
         # shows n most recent actions and rewards
         table = Table(title=f"Step history (showing {n} records)")
-        actions_obsspd = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.action1_history))):
-            actions_obsspd[i] = self.action1_history[-i-1]
-        actions_txpower = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.action2_history))):
-            actions_txpower[i] = self.action2_history[-i-1]
-        rewards = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.reward_history))):
-            rewards[i] = self.reward_history[-i-1]
-        steps = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.step_num_history))):
-            steps[i] = self.step_num_history[-i-1]
-        total_thpts = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.total_thpt_history))):
-            total_thpts[i] = self.total_thpt_history[-i-1]
-        vr_thpts = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.vr_thpt_history))):
-            vr_thpts[i] = self.vr_thpt_history[-i-1]
-        vr_delays = np.full((n, ), np.nan)
-        for i in range(min(n, len(self.vr_delay_history))):
-            vr_delays[i] = self.vr_delay_history[-i-1]
+        actions_obsspd = self.history_tail('action1', n)
+        actions_txpower = self.history_tail('action2', n)
+        rewards = self.history_tail('reward', n)
+        steps = self.history_tail('step_num', n)
+        total_thpts = self.history_tail('total_thpt', n)
+        vr_thpts = self.history_tail('vr_thpt', n)
+        vr_delays = self.history_tail('vr_delay', n)
         
         table.add_column("# timestep")
         table.add_column("total thpt (Mbps)")
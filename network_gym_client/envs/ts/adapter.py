@@ -11,6 +11,7 @@ import math
 import time
 import pandas as pd
 import json
+import logging
 from pathlib import Path
 import plotext
 from rich.panel import Panel
@@ -18,6 +19,8 @@ from rich.layout import Layout
 from rich.table import Table
 from rich.columns import Columns
 
+logger = logging.getLogger(__name__)
+
 class Adapter(network_gym_client.adapter.Adapter):
     """nqos_split env adapter.
 
@@ -38,7 +41,11 @@ class Adapter(network_gym_client.adapter.Adapter):
         if config_json['env_config']['env'] != self.env:
             sys.exit("[ERROR] wrong environment Adapter. Configured environment: " + str(config_json['env_config']['env']) + " != Launched environment: " + str(self.env))
 
+        self.action_space = spaces.MultiDiscrete(np.array([12]), start=np.array([0]), seed=42)
+        self.observation_space = spaces.Box(low=0, high=10000, shape=(2, 1), dtype=np.uint32)
+
         self.mcs = None
+        self.enable_visualization = config_json['enable_terminal_redering']
 
     def get_action_space(self):
         """Get action space for the nqos_split env.
@@ -46,7 +53,7 @@ class Adapter(network_gym_client.adapter.Adapter):
         Returns:
             spaces: action spaces
         """
-        return spaces.MultiDiscrete(np.array([12]), start=np.array([0]), seed=42)
+        return self.action_space
 
     #consistent with the get_observation function.
     def get_observation_space(self):
@@ -55,9 +62,32 @@ class Adapter(network_gym_client.adapter.Adapter):
         Returns:
             spaces: observation spaces
         """
+        return self.observation_space
+
+    def get_counts(self, df):
+        """Get the success and failure counts from the network stats.
+
+        Args:
+            df (pd.DataFrame): network stats measurement
+
+        Returns:
+            tuple: (succ_value, fail_value), -1 for a missing measurement
+        """
+        succ_value = -1
+        fail_value = -1
+
+        values = df['value'].to_numpy()
+        succ_idx = self.find_row(df, 'TsRateControl', 'meas::succ')
+        if succ_idx >= 0:
+            succ_value = values[succ_idx][0]
+            self.action_data_format = df.iloc[succ_idx]
+            self.policy_template = self.action_data_format.to_dict()
+        fail_idx = self.find_row(df, 'TsRateControl', 'meas::fail')
+        if fail_idx >= 0:
+            fail_value = values[fail_idx][0]
+
+        return (succ_value, fail_value)
 
-        return spaces.Box(low=0, high=10000, shape=(2, 1), dtype=np.uint32)
-    
     def get_observation(self, df):
         """Prepare observation for nqos_split env.
 
@@ -70,22 +100,14 @@ class Adapter(network_gym_client.adapter.Adapter):
             spaces: observation spaces
         """
 
-        succ_value = -1
-        fail_value = -1
+        succ_value, fail_value = self.decode_measurement(df, self.get_counts)
 
-        for _, row in df.iterrows():
-            if row['source'] == 'TsRateControl' and row['name'] == 'meas::succ':
-                succ_value = row['value'][0]
-                self.action_data_format = row
-            if row['source'] == 'TsRateControl' and row['name'] == 'meas::fail':
-                fail_value = row['value'][0]
-
-        print("succ_value is", succ_value)
-        print("fail_value is", fail_value)
+        logger.debug('succ_value is %s', succ_value)
+        logger.debug('fail_value is %s', fail_value)
 
         self.observation = np.vstack([succ_value, fail_value])
-        print("obs shape is", self.observation.shape)
-        print('Observation --> ' + str(self.observation))
+        logger.debug('obs shape is %s', self.observation.shape)
+        logger.debug('Observation --> %s', self.observation)
 
         # visualization of observation and (previous) action
         self.visualize_thompson_sampling()
@@ -104,11 +126,11 @@ class Adapter(network_gym_client.adapter.Adapter):
 
         self.mcs = action[0]
 
-        policy = json.loads(self.action_data_format.to_json())
+        policy = dict(self.policy_template)
         policy["name"] = "mcsNew"
         policy["value"] = action.tolist()
 
-        print('Action --> ' + str(policy))
+        logger.debug('Action --> %s', policy)
         return policy
 
     def get_reward(self, df):
@@ -121,15 +143,7 @@ class Adapter(network_gym_client.adapter.Adapter):
             spaces: reward spaces
         """
 
-        succ_value = -1
-        fail_value = -1
-
-        for _, row in df.iterrows():
-            if row['source'] == 'TsRateControl' and row['name'] == 'meas::succ':
-                succ_value = row['value'][0]
-                self.action_data_format = row
-            if row['source'] == 'TsRateControl' and row['name'] == 'meas::fail':
-                fail_value = row['value'][0]
+        succ_value, fail_value = self.decode_measurement(df, self.get_counts)
 
         # PER (actually this value is not used by the algorithm)
         self.reward = succ_value / (succ_value + fail_value)
@@ -137,7 +151,7 @@ class Adapter(network_gym_client.adapter.Adapter):
 
     def visualize_thompson_sampling(self):
         # visualize the two nodes, the link between them, success and failure counts
-        if self.layout is None:
+        if not self.enable_visualization or self.layout is None:
             return
         left = self.layout["left"]
         mixin_left = Panel(self.plotextMixin(self.make_plot))
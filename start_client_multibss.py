@@ -6,7 +6,6 @@ from network_gym_client import load_config_file
 from network_gym_client import Env as NetworkGymEnv
 import numpy as np
 import random
-from collections import namedtuple, deque
 import math
 import torch
 import torch.nn as nn
@@ -19,6 +18,8 @@ device = torch.device(
     ("mps" if torch.backends.mps.is_available() else "cpu")
 )
 print(f"PyTorch will use device {device}")
+# host tensors copied to the device are pinned so the copy can run asynchronously
+pin_memory = device.type == "cuda"
 time.sleep(1)
 
 client_id = 0
@@ -28,22 +29,42 @@ config_json["rl_config"]["agent"] = "muyuan_agent"
 # Create the environment
 env = NetworkGymEnv(client_id, config_json) # make a network env using pass client id and configure file arguments.
 
-Transition = namedtuple('Transition',
-                        ('state', 'action', 'next_state', 'reward'))
-
 class ReplayMemory(object):
-    def __init__(self, capacity):
-        self.memory = deque([], maxlen=capacity)
-
-    def push(self, *args):
+    def __init__(self, capacity, n_observation):
+        self.capacity = capacity
+        self.position = 0
+        self.size = 0
+        # circular buffer of transitions kept in host memory
+        self.states = torch.empty((capacity, n_observation))
+        self.actions = torch.empty((capacity, 1), dtype=torch.long)
+        self.next_states = torch.empty((capacity, n_observation))
+        self.rewards = torch.empty(capacity)
+        self.done = torch.zeros(capacity, dtype=torch.bool)
+        self.batch = None
+
+    def push(self, state, action, next_state, reward, done=False):
         """Save a transition"""
-        self.memory.append(Transition(*args))
+        self.states[self.position] = state.view(-1)
+        self.actions[self.position] = action.view(-1)
+        self.next_states[self.position] = next_state.view(-1)
+        self.rewards[self.position] = reward
+        self.done[self.position] = done
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
 
     def sample(self, batch_size):
-        return random.sample(self.memory, batch_size)
+        """Sample a batch of transitions and move it to the device"""
+        idx = torch.randint(0, self.size, (batch_size,))
+        buffers = (self.states, self.actions, self.next_states, self.rewards, self.done)
+        if self.batch is None or self.batch[0].shape[0] != batch_size:
+            self.batch = [torch.empty((batch_size,) + buffer.shape[1:], dtype=buffer.dtype, pin_memory=pin_memory) for buffer in buffers]
+        for buffer, batch in zip(buffers, self.batch):
+            torch.index_select(buffer, 0, idx, out=batch)
+        # the staging buffers are only rewritten after the main loop has synchronized on action.cpu()
+        return tuple(batch.to(device, non_blocking=True) for batch in self.batch)
 
     def __len__(self):
-        return len(self.memory)
+        return self.size
 
 class DQN(nn.Module):
     def __init__(self, n_observations, n_actions):
@@ -69,16 +90,22 @@ LR = 1e-4
 n_ap = 4
 network_size = 4
 n_total = n_ap * (network_size + 1)
-state = np.zeros((network_size + 1, n_total + 1))
+n_observation = (network_size + 1) * (n_total + 1)
+# the observation is written straight into cur_state through the numpy view `state`
+cur_state = torch.zeros((1, n_observation), pin_memory=pin_memory)
+state = cur_state.numpy().reshape(network_size + 1, n_total + 1)
+prev_state = torch.zeros((1, n_observation))
+device_state = cur_state if device.type == "cpu" else torch.empty((1, n_observation), device=device)
 rewards = []
 overall_rewards = []
-n_observation = state.size
 n_action = env.adapter.get_action_space().nvec[0]
 policy_net = DQN(n_observation, n_action).to(device)
 target_net = DQN(n_observation, n_action).to(device)
 target_net.load_state_dict(policy_net.state_dict())
+policy_params = list(policy_net.parameters())
+target_params = list(target_net.parameters())
 optimizer = optim.AdamW(policy_net.parameters(), lr=LR, amsgrad=True)
-memory = ReplayMemory(200)
+memory = ReplayMemory(200, n_observation)
 
 steps_done = 0
 
@@ -97,28 +124,19 @@ def select_action(state):
 def optimize_model():
     if len(memory) < BATCH_SIZE:
         return
-    transitions = memory.sample(BATCH_SIZE)
-    batch = Transition(*zip(*transitions))
-    non_final_mask = torch.tensor(tuple(map(lambda s: s is not None,
-                                            batch.next_state)), device=device, dtype=torch.bool)
-    non_final_next_states = torch.cat([s for s in batch.next_state
-                                       if s is not None])
-    state_batch = torch.cat(batch.state)
-    action_batch = torch.cat(batch.action)
-    reward_batch = torch.cat(batch.reward)
+    state_batch, action_batch, next_state_batch, reward_batch, done_batch = memory.sample(BATCH_SIZE)
     state_action_values = policy_net(state_batch).gather(1, action_batch)
 
-    next_state_values = torch.zeros(BATCH_SIZE, device=device)
     with torch.no_grad():
-        next_state_values[non_final_mask] = target_net(non_final_next_states).max(1)[0]
+        next_state_values = target_net(next_state_batch).max(1)[0]
+    next_state_values[done_batch] = 0
     expected_state_action_values = (next_state_values * GAMMA) + reward_batch
 
     # print("state_action_values:", state_action_values)
     # print("expected_state_action_values:", expected_state_action_values)
 
     criterion = nn.SmoothL1Loss()
-    # loss = criterion(state_action_values, expected_state_action_values.unsqueeze(1))
-    loss = criterion(state_action_values, expected_state_action_values[:, :1])
+    loss = criterion(state_action_values, expected_state_action_values.unsqueeze(1))
 
     optimizer.zero_grad()
     loss.backward()
@@ -132,23 +150,22 @@ for step in range(num_steps):
 
     state[:, :n_total] = obs[0][:network_size+1, :n_total]
     state[:, -1] = obs[1][:network_size+1]
-    cur_state = torch.tensor(state.reshape(1, -1)[0], dtype=torch.float32, device=device).unsqueeze(0)
 
     if step == 0:
-        prev_state = cur_state
-        action = torch.tensor([[0]], device=device, dtype=torch.long)
+        action = torch.tensor([[0]], dtype=torch.long)
     else:
         rewards.append(reward)
-        reward = torch.tensor([reward], device=device)
-        memory.push(prev_state, action, cur_state, reward)
-        prev_state = cur_state
-        action = select_action(cur_state)
+        # the adapter returns the reward as a 1-element array
+        memory.push(prev_state, action, cur_state, reward.item())
+        if device_state is not cur_state:
+            device_state.copy_(cur_state, non_blocking=True)
+        action = select_action(device_state).cpu()
         optimize_model()
-        target_net_state_dict = target_net.state_dict()
-        policy_net_state_dict = policy_net.state_dict()
-        for key in policy_net_state_dict:
-            target_net_state_dict[key] = policy_net_state_dict[key]*TAU + target_net_state_dict[key]*(1-TAU)
-        target_net.load_state_dict(target_net_state_dict)
+        # soft update of the target network: target = TAU * policy + (1 - TAU) * target
+        with torch.no_grad():
+            torch._foreach_mul_(target_params, 1 - TAU)
+            torch._foreach_add_(target_params, policy_params, alpha=TAU)
+    prev_state.copy_(cur_state)
 
     action_int = action.cpu().numpy()[0][0] + (-82)
     obs, reward, terminated, truncated, info = env.step(np.array([action_int]))
@@ -4,6 +4,7 @@
 
 from network_gym_client import load_config_file
 from network_gym_client import Env as NetworkGymEnv
+from network_gym_client.envs.obss.adapter import RX_POWER_SCALE
 import numpy as np
 import random
 from collections import namedtuple, deque
@@ -130,9 +131,10 @@ obs, info = env.reset()
 
 for step in range(num_steps):
 
-    state[:, :n_total] = obs[0][:network_size+1, :n_total]
+    # RX power is observed as int8, restore it to dBm
+    state[:, :n_total] = obs[0][:network_size+1, :n_total] / RX_POWER_SCALE
     state[:, -1] = obs[1][:network_size+1]
-    cur_state = torch.tensor(state.reshape(1, -1)[0], dtype=torch.float32, device=device).unsqueeze(0)
+    cur_state = torch.tensor(state.ravel(), dtype=torch.float32, device=device).unsqueeze(0)
 
     if step == 0:
         prev_state = cur_state
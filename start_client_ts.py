@@ -18,13 +18,15 @@ plt.rcParams.update({
 })
 
 # MCS 0 - 11
-mcs_Mbps_20mhz = [8.6, 17.2, 25.8, 34.4, 51.6, 68.8, 
-                  77.4, 86.0, 103.2, 114.7, 129.0, 143.4]
+mcs_Mbps_20mhz = np.array([8.6, 17.2, 25.8, 34.4, 51.6, 68.8,
+                           77.4, 86.0, 103.2, 114.7, 129.0, 143.4])
 
 # statistics per MCS
 mcs_alpha = np.zeros(12)
 mcs_beta = np.zeros(12)
 
+rng = np.random.default_rng(42)
+
 client_id = 0
 env_name = "ts"
 config_json = load_config_file(env_name)
@@ -36,7 +38,6 @@ num_steps = 100
 obs, info = env.reset()
 
 action = np.array([0])  # try MCS 0 first
-prev_action = np.array([-1])
 
 mcs_vs_time = np.zeros(num_steps)
 last_step = 0
@@ -44,18 +45,19 @@ last_step = 0
 for step in range(num_steps):
 
     obs, _, terminated, truncated, _ = env.step(action)
-    prev_action = action
 
     if np.sum(obs) == 0:
         continue
 
     # get new action
-    mcs_old = prev_action[0]
+    mcs_old = action[0]
     n_succ = obs[0][0]
     n_fail = obs[1][0]
     mcs_alpha[mcs_old] += n_succ
     mcs_beta[mcs_old] += n_fail
-    mcs_new = np.argmax(np.random.beta(mcs_alpha + 1, mcs_beta + 1) * mcs_Mbps_20mhz)
+    samples = rng.beta(mcs_alpha + 1, mcs_beta + 1)
+    samples *= mcs_Mbps_20mhz
+    mcs_new = int(np.argmax(samples))
     action = np.array([mcs_new])
 
     mcs_vs_time[step] = mcs_new